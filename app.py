@@ -6,6 +6,7 @@ import plotly.graph_objects as go
 import requests
 import json
 import time
+import threading
 from datetime import datetime
 
 # Set page configuration
@@ -63,40 +64,125 @@ div[data-testid="stMetric"] {
 # API base URL - change this if your API is running on a different host/port
 API_URL = "http://localhost:8000"
 
+REQUEST_TIMEOUT = (3, 30)  # (connect, read) seconds
+
+# Columns returned by the API for each stored record
+DATA_COLS = [
+    "Type",
+    "Air temperature [K]",
+    "Process temperature [K]",
+    "Rotational speed [rpm]",
+    "Torque [Nm]",
+    "Tool wear [min]",
+    "prediction"
+]
+
+# Narrowest dtypes that hold each column's value range. Rotational speed and
+# tool wear stay float: /predict accepts (and stores) arbitrary float values.
+DATA_DTYPES = {
+    "Type": "int8",
+    "Air temperature [K]": "float32",
+    "Process temperature [K]": "float32",
+    "Rotational speed [rpm]": "float32",
+    "Torque [Nm]": "float32",
+    "Tool wear [min]": "float32",
+    "prediction": "int8"
+}
+
+# Shared HTTP session so connections to the API are pooled (keep-alive).
+# Cached as a resource so it survives Streamlit reruns of this script.
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    session.mount(
+        API_URL,
+        requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=3)
+    )
+    return session
+
+SESSION = get_session()
+
 # Title
 st.markdown("<div class='title'>Predictive Maintenance Dashboard</div>", unsafe_allow_html=True)
 
-# Sidebar for controls
-with st.sidebar:
-    st.header("Controls")
+# Data version pushed by the API over Server-Sent Events. A single background
+# thread per server process listens to /events and records the latest version.
+@st.cache_resource
+def start_version_listener():
+    state = {"version": None}
     
+    def listen():
+        while True:
+            try:
+                with requests.get(f"{API_URL}/events", stream=True, timeout=REQUEST_TIMEOUT) as response:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data:"):
+                            state["version"] = int(line[len("data:"):].strip())
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(1)  # Reconnect when the stream ends or the API goes away
+    
+    threading.Thread(target=listen, daemon=True).start()
+    return state
+
+VERSION_LISTENER = start_version_listener()
+if "data_version" not in st.session_state:
+    st.session_state["data_version"] = VERSION_LISTENER["version"]
+
+# Reruns the whole dashboard only when the data version actually changes
+@st.fragment(run_every=1)
+def watch_data_version():
+    if VERSION_LISTENER["version"] != st.session_state["data_version"]:
+        st.session_state["data_version"] = VERSION_LISTENER["version"]
+        st.rerun()
+
+# Sidebar controls are fragments, so using them reruns only that control.
+# Success messages live in session state so they survive the dashboard
+# rerun triggered by the resulting data change.
+MESSAGE_KEYS = ["generate_message", "clear_message", "prediction_result"]
+
+# Widget callback: messages are shown until the next interaction
+def clear_messages():
+    for key in MESSAGE_KEYS:
+        st.session_state.pop(key, None)
+
+@st.fragment
+def generate_data_controls():
     # Generate synthetic data
     st.subheader("Generate Data")
-    data_count = st.slider("Number of data points", 10, 10000, 100)
-    if st.button("Generate Data"):
+    data_count = st.slider("Number of data points", 10, 10000, 100, on_change=clear_messages)
+    if st.button("Generate Data", on_click=clear_messages):
         with st.spinner("Generating data..."):
             try:
-                response = requests.post(f"{API_URL}/generate_data?count={data_count}")
+                response = SESSION.post(f"{API_URL}/generate_data?count={data_count}", stream=False, timeout=REQUEST_TIMEOUT)
                 if response.status_code == 200:
-                    st.success(f"Generated {data_count} data points")
+                    st.session_state["generate_message"] = f"Generated {data_count} data points"
                 else:
                     st.error(f"Failed to generate data: {response.text}")
-            except requests.exceptions.ConnectionError:
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
                 st.error(f"Could not connect to API at {API_URL}. Make sure the FastAPI server is running.")
-    
+    if "generate_message" in st.session_state:
+        st.success(st.session_state["generate_message"])
+
+@st.fragment
+def clear_data_controls():
     # Clear data
     st.subheader("Clear Data")
-    if st.button("Clear All Data"):
+    if st.button("Clear All Data", on_click=clear_messages):
         with st.spinner("Clearing data..."):
             try:
-                response = requests.delete(f"{API_URL}/clear_data")
+                response = SESSION.delete(f"{API_URL}/clear_data", stream=False, timeout=REQUEST_TIMEOUT)
                 if response.status_code == 200:
-                    st.success("All data cleared")
+                    st.session_state["clear_message"] = "All data cleared"
                 else:
                     st.error(f"Failed to clear data: {response.text}")
-            except requests.exceptions.ConnectionError:
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
                 st.error(f"Could not connect to API at {API_URL}. Make sure the FastAPI server is running.")
-    
+    if "clear_message" in st.session_state:
+        st.success(st.session_state["clear_message"])
+
+@st.fragment
+def prediction_controls():
     # Manual prediction
     st.subheader("Test Prediction")
     with st.form("prediction_form"):
@@ -107,7 +193,7 @@ with st.sidebar:
         torque = st.slider("Torque [Nm]", 3.5, 77.0, 40.0, 0.1)
         tool_wear = st.slider("Tool Wear [min]", 0, 253, 100)
         
-        submit_button = st.form_submit_button("Predict")
+        submit_button = st.form_submit_button("Predict", on_click=clear_messages)
         
         if submit_button:
             data = {
@@ -120,55 +206,140 @@ with st.sidebar:
             }
             
             try:
-                response = requests.post(f"{API_URL}/predict", json=data)
+                response = SESSION.post(f"{API_URL}/predict", json=data, stream=False, timeout=REQUEST_TIMEOUT)
                 
                 if response.status_code == 200:
                     result = response.json()
-                    prediction = result["prediction"]
-                    failure = "Yes" if prediction == 0 else "No"
-                    color_class = "failure-1" if prediction == 1 else "failure-0"
-                    
-                    st.markdown(f"""
-                    <div class='metric-container'>
-                        <h3>Prediction Result</h3>
-                        <p>Machine Failure: <span class='{color_class}'>{failure}</span></p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.session_state["prediction_result"] = result["prediction"]
                 else:
                     st.error(f"Prediction failed: {response.text}")
-            except requests.exceptions.ConnectionError:
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
                 st.error(f"Could not connect to API at {API_URL}. Make sure the FastAPI server is running.")
+        
+        if "prediction_result" in st.session_state:
+            prediction = st.session_state["prediction_result"]
+            failure = "Yes" if prediction == 0 else "No"
+            color_class = "failure-1" if prediction == 1 else "failure-0"
+            
+            st.markdown(f"""
+            <div class='metric-container'>
+                <h3>Prediction Result</h3>
+                <p>Machine Failure: <span class='{color_class}'>{failure}</span></p>
+            </div>
+            """, unsafe_allow_html=True)
+
+# Sidebar for controls
+with st.sidebar:
+    st.header("Controls")
+    generate_data_controls()
+    clear_data_controls()
+    prediction_controls()
+
+watch_data_version()
+
+# Fetch functions take the data version as their first argument so it is part
+# of the cache key: reruns with unchanged data are cache hits, and a new version
+# forces a refetch. The TTL only guards against writes that bypass the API.
+# They raise on failure (exceptions are never cached), and the get_* wrappers
+# below report the error and fall back to an empty result for this run only.
+
+def check_response(response):
+    if response.status_code != 200:
+        raise requests.exceptions.HTTPError(response.text, response=response)
+
+@st.cache_data(ttl=60)
+def fetch_data(data_version, limit=100):
+    # The API streams NDJSON; parse it straight off the socket
+    with SESSION.get(f"{API_URL}/data?limit={limit}", stream=True, timeout=REQUEST_TIMEOUT) as response:
+        check_response(response)
+        response.raw.decode_content = True
+        df = pd.read_json(response.raw, lines=True)
+    if df.empty:
+        return pd.DataFrame()
+    return df.reindex(columns=DATA_COLS).astype(DATA_DTYPES)
+
+@st.cache_data(ttl=60)
+def fetch_stats(data_version):
+    response = SESSION.get(f"{API_URL}/stats", stream=False, timeout=REQUEST_TIMEOUT)
+    check_response(response)
+    return response.json()
+
+@st.cache_data(ttl=60)
+def fetch_sample(data_version, n=500):
+    response = SESSION.get(f"{API_URL}/sample?n={n}", stream=False, timeout=REQUEST_TIMEOUT)
+    check_response(response)
+    df = pd.DataFrame(response.json()["data"])
+    return df.astype({col: dtype for col, dtype in DATA_DTYPES.items() if col in df.columns})
 
 # Function to fetch data from API
-@st.cache_data(ttl=5)  # Cache data for 5 seconds
-def get_data():
+def get_data(data_version, limit=100):
+    try:
+        return fetch_data(data_version, limit)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        st.error(f"Could not connect to API at {API_URL}. Make sure the FastAPI server is running.")
+        return pd.DataFrame()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Error response, a stream that broke off mid-response, or unparseable data
+        st.error(f"Failed to fetch data: {e}")
+        return pd.DataFrame()
+
+# Function to fetch aggregated statistics (computed by the database) from API
+def get_stats(data_version):
     try:
-        response = requests.get(f"{API_URL}/data")
-        if response.status_code == 200:
-            data = response.json()["data"]
-            if data:
-                return pd.DataFrame(data)
-            else:
-                return pd.DataFrame()
-        else:
-            st.error(f"Failed to fetch data: {response.text}")
-            return pd.DataFrame()
-    except requests.exceptions.ConnectionError:
+        return fetch_stats(data_version)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
         st.error(f"Could not connect to API at {API_URL}. Make sure the FastAPI server is running.")
+        return {"count": 0}
+    except (requests.exceptions.RequestException, ValueError) as e:
+        st.error(f"Failed to fetch statistics: {e}")
+        return {"count": 0}
+
+# Function to fetch a random sample of rows for the scatter plots
+def get_sample(data_version, n=500):
+    try:
+        return fetch_sample(data_version, n)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        st.error(f"Could not connect to API at {API_URL}. Make sure the FastAPI server is running.")
+        return pd.DataFrame()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Malformed response, or records with missing values that can't be downcast
+        st.error(f"Failed to fetch sample: {e}")
         return pd.DataFrame()
 
-# Get data
-df = get_data()
-st.write(f"Fetched {len(df)} rows")
+# WebGL scatter plot with one trace per prediction class
+def scatter_gl(df, x, y, title):
+    fig = go.Figure()
+    if not df.empty:
+        for prediction, color in zip([0, 1], ["#3498db", "#e74c3c"]):
+            points = df[df["prediction"] == prediction]
+            fig.add_trace(go.Scattergl(
+                x=points[x].to_numpy(),
+                y=points[y].to_numpy(),
+                mode="markers",
+                name=str(prediction),
+                marker=dict(color=color, opacity=0.7),
+            ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=x,
+        yaxis_title=y,
+        legend_title="prediction",
+    )
+    return fig
+
+# Get statistics
+data_version = st.session_state["data_version"]
+stats = get_stats(data_version)
+st.write(f"Fetched statistics for {stats['count']} rows")
 # Main dashboard
-if df.empty:
+if stats["count"] == 0:
     st.info("No data available. Generate some data using the sidebar controls.")
 else:
     # Create metrics and visualizations
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        max_torque = df["Torque [Nm]"].max()
+        max_torque = stats["max_torque"]
         st.markdown(f"""
         <div class='metric-container'>
             <h3>Max of Torque [Nm]</h3>
@@ -177,7 +348,7 @@ else:
         """, unsafe_allow_html=True)
     
     with col2:
-        max_tool_wear = df["Tool wear [min]"].max()
+        max_tool_wear = stats["max_tool_wear"]
         st.markdown(f"""
         <div class='metric-container'>
             <h3>Max of Tool wear [min]</h3>
@@ -186,7 +357,7 @@ else:
         """, unsafe_allow_html=True)
     
     with col3:
-        avg_rotational_speed = df["Rotational speed [rpm]"].mean()
+        avg_rotational_speed = stats["avg_rpm"]
         st.markdown(f"""
         <div class='metric-container'>
             <h3>Average of Rotational speed [rpm]</h3>
@@ -199,7 +370,7 @@ else:
     
     with col1:
         # Machine Failure Count
-        failure_counts = df["prediction"].value_counts().reset_index()
+        failure_counts = pd.DataFrame(stats["failure_counts"])
         failure_counts.columns = ["Failure", "Count"]
         
         fig = px.bar(
@@ -219,7 +390,7 @@ else:
         st.plotly_chart(fig, use_container_width=True)
         
         # Count of Type by Type
-        type_counts = df["Type"].value_counts().reset_index()
+        type_counts = pd.DataFrame(stats["type_counts"])
         type_counts.columns = ["Type", "Count"]
         
         fig = px.pie(
@@ -238,7 +409,7 @@ else:
     
     with col2:
         # Count of Type by Target and Failure Type
-        type_target_counts = df.groupby(["Type", "prediction"]).size().reset_index(name="Count")
+        type_target_counts = pd.DataFrame(stats["type_prediction_counts"])
         
         fig = px.bar(
             type_target_counts,
@@ -258,9 +429,8 @@ else:
         st.plotly_chart(fig, use_container_width=True)
         
         # Count of Target by Target
-        target_counts = df["prediction"].value_counts(normalize=True).reset_index()
-        target_counts.columns = ["Target", "Percentage"]
-        target_counts["Percentage"] = target_counts["Percentage"] * 100
+        target_counts = failure_counts.rename(columns={"Failure": "Target", "Count": "Percentage"})
+        target_counts["Percentage"] = target_counts["Percentage"] / stats["count"] * 100
         
         fig = px.pie(
             target_counts,
@@ -303,16 +473,13 @@ else:
     
     with col2:
         # Air Temp v/s Rotational Speed
-        df_sample = df.sample(min(len(df), 500))
+        df_sample = get_sample(data_version)
         
-        fig = px.scatter(
+        fig = scatter_gl(
             df_sample,
             x="Rotational speed [rpm]",
             y="Air temperature [K]",
             title="Air Temp v/s Rotational Speed",
-            color="prediction",
-            color_discrete_sequence=["#3498db", "#e74c3c"],
-            opacity=0.7,
         )
         fig.update_layout(
             plot_bgcolor="#2D2D5D",
@@ -323,14 +490,11 @@ else:
     
     with col3:
         # Process Temp v/s Rotational Speed
-        fig = px.scatter(
+        fig = scatter_gl(
             df_sample,
             x="Rotational speed [rpm]",
             y="Process temperature [K]",
             title="Process Temp v/s Rotational Speed",
-            color="prediction",
-            color_discrete_sequence=["#3498db", "#e74c3c"],
-            opacity=0.7,
         )
         fig.update_layout(
             plot_bgcolor="#2D2D5D",
@@ -341,4 +505,16 @@ else:
     
     # Display raw data (collapsible)
     with st.expander("View Raw Data"):
-        st.dataframe(df.head(100).style.background_gradient(cmap='viridis', subset=["Tool wear [min]", "Torque [Nm]"]))
\ No newline at end of file
+        df = get_data(data_version)
+        # Native column types are rendered in the browser, no per-cell CSS from pandas Styler
+        st.dataframe(
+            df.head(100),
+            column_config={
+                "Tool wear [min]": st.column_config.ProgressColumn(
+                    "Tool wear [min]", format="%d", min_value=0, max_value=253
+                ),
+                "Torque [Nm]": st.column_config.ProgressColumn(
+                    "Torque [Nm]", format="%.2f", min_value=0, max_value=77
+                ),
+            },
+        )
\ No newline at end of file
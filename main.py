@@ -1,17 +1,38 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 import pickle
 import pandas as pd
 import numpy as np
 from pymongo import MongoClient
+from pymongo.write_concern import WriteConcern
 from typing import List, Dict, Any
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
-import random
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import os
-import json
+import warnings
+import asyncio
+import random
+import time
+import itertools
+import orjson
 
-app = FastAPI(title="Predictive Maintenance API")
+@asynccontextmanager
+async def lifespan(app):
+    # Run the /predict micro-batcher for the lifetime of the app
+    global predict_queue
+    predict_queue = asyncio.Queue()
+    batcher = asyncio.create_task(predict_batcher())
+    yield
+    batcher.cancel()
+
+# orjson encodes straight to bytes and is much faster than stdlib json on large /data payloads
+app = FastAPI(
+    title="Predictive Maintenance API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -28,38 +49,95 @@ MONGODB_URI = os.environ.get("MONGODB_URI", "mongodb://localhost:27017/")
 DB_NAME = os.environ.get("MONGODB_DB", "maintenance_db")
 COLLECTION_NAME = os.environ.get("MONGODB_COLLECTION", "machine_data")
 
-DATA_FILE = "machine_data.json"  # For fallback file-based storage
+DATA_FILE = "machine_data.jsonl"  # For fallback file-based storage (one JSON record per line)
+LEGACY_DATA_FILE = "machine_data.json"  # Previous fallback format (single JSON array)
 
 try:
     client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
     db = client[DB_NAME]
     collection = db[COLLECTION_NAME]
+    # Bulk loads of synthetic data don't need to wait for the journal
+    bulk_collection = collection.with_options(write_concern=WriteConcern(w=1, j=False))
     # Test connection
     client.server_info()
     print(f"✅ Connected to MongoDB at {MONGODB_URI}")
     use_mongodb = True
 except Exception as e:
     print(f"❌ Failed to connect to MongoDB: {e}")
-    print("Using fallback to JSON file storage.")
-    # Fallback to file-based storage
-    # Initialize empty data file if it doesn't exist
-    if not os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "w") as f:
-            json.dump([], f)
+    print("Using fallback to JSON Lines file storage.")
     use_mongodb = False
 
+RNG = np.random.default_rng()
+
+# Dummy model for demonstration when no trained model is available
+class DummyModel:
+    def predict(self, X):
+        return RNG.integers(0, 2, size=len(X), dtype=np.int8)
+
 # Load the trained model
-try:
-    with open("model.pkl", "rb") as file:
-        model = pickle.load(file)
-    print("✅ Model loaded successfully!")
-except FileNotFoundError:
-    # Create a dummy model for demonstration
-    class DummyModel:
-        def predict(self, X):
-            return np.random.choice([0, 1], size=len(X))
-    model = DummyModel()
-    print("⚠️ Warning: model.pkl not found. Using dummy model instead.")
+def load_model(path="model.pkl"):
+    try:
+        with open(path, "rb") as file:
+            model = pickle.load(file)
+        print("✅ Model loaded successfully!")
+    except FileNotFoundError:
+        model = DummyModel()
+        print("⚠️ Warning: model.pkl not found. Using dummy model instead.")
+    
+    # /predict passes plain ndarrays to a model fitted on a DataFrame; the
+    # column order is fixed by FEATURE_COLS, so the name check warning is noise
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    
+    # Predictions are small (1 row per request, at most a few thousand per batch),
+    # so joblib's parallel dispatch costs more than it saves
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    
+    # Warm up with one prediction so one-time initialization isn't paid by the first request
+    model.predict(np.zeros((1, 6), dtype=np.float64))
+    return model
+
+model = load_model()
+
+# Feature columns in the order the model was trained on
+FEATURE_COLS = [
+    "Type",
+    "Air temperature [K]",
+    "Process temperature [K]",
+    "Rotational speed [rpm]",
+    "Torque [Nm]",
+    "Tool wear [min]"
+]
+
+# Only ship the stored columns back from MongoDB
+DATA_PROJECTION = {"_id": 0, **{col: 1 for col in FEATURE_COLS}, "prediction": 1}
+
+# Columns plotted by the dashboard's scatter charts; samples carry nothing else
+SAMPLE_COLS = ["Air temperature [K]", "Process temperature [K]", "Rotational speed [rpm]", "prediction"]
+SAMPLE_PROJECTION = {"_id": 0, **{col: 1 for col in SAMPLE_COLS}}
+
+# Single aggregation pipeline computing the summary statistics in one pass
+STATS_PIPELINE = [
+    {"$facet": {
+        "summary": [{"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "max_torque": {"$max": "$Torque [Nm]"},
+            "max_tool_wear": {"$max": "$Tool wear [min]"},
+            "avg_rpm": {"$avg": "$Rotational speed [rpm]"}
+        }}],
+        "failure_counts": [{"$sortByCount": "$prediction"}],
+        "type_counts": [{"$sortByCount": "$Type"}]
+    }}
+]
+
+# Kept out of $facet (whose sub-pipelines can't use indexes) so the leading
+# $sort can walk the (Type, prediction) compound index
+TYPE_PREDICTION_PIPELINE = [
+    {"$sort": {"Type": 1, "prediction": 1}},
+    {"$group": {"_id": {"Type": "$Type", "prediction": "$prediction"}, "count": {"$sum": 1}}},
+    {"$sort": {"_id.Type": 1, "_id.prediction": 1}}
+]
 
 class MachineData(BaseModel):
     Type: int = Field(..., description="Machine type (0, 1, or 2)")
@@ -73,42 +151,113 @@ class MachineDataBatch(BaseModel):
     data: List[MachineData]
 
 # File-based storage functions (fallback)
-def get_all_data():
+def load_data():
+    # One-time conversion of data stored in the previous JSON array format
+    if not os.path.exists(DATA_FILE) and os.path.exists(LEGACY_DATA_FILE):
+        with open(LEGACY_DATA_FILE, "rb") as f:
+            legacy_data = orjson.loads(f.read())
+        with open(DATA_FILE, "wb") as f:
+            f.writelines(orjson.dumps(record) + b"\n" for record in legacy_data)
+        print(f"Converted {len(legacy_data)} records from {LEGACY_DATA_FILE} to {DATA_FILE}")
+    
+    # Initialize empty data file if it doesn't exist
     if not os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "w") as f:
-            json.dump([], f)
-    with open(DATA_FILE, "r") as f:
-        return json.load(f)
+        open(DATA_FILE, "wb").close()
+    with open(DATA_FILE, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+def append_data(records):
+    # Append-only: each record is one line, nothing is re-read or rewritten
+    with open(DATA_FILE, "ab") as f:
+        f.writelines(orjson.dumps(record) + b"\n" for record in records)
+    DATA_CACHE.extend(records)
+
+def clear_file_data():
+    open(DATA_FILE, "wb").close()
+    DATA_CACHE.clear()
 
-def save_data(data_list):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data_list, f, indent=2)
+# In-memory mirror of the data file, loaded once at startup. Deliberately
+# unbounded: /stats aggregates, /sample draws from, and /data?limit=0 returns
+# every stored record, so the cache must hold the whole file. It is no larger
+# than the full-file list every request used to load, and /clear_data empties it.
+# Deployments that outgrow memory should use MongoDB rather than this fallback.
+DATA_CACHE: List[Dict[str, Any]] = [] if use_mongodb else load_data()
+
+# Data version, bumped on every write and pushed to dashboard clients over /events.
+# Seeded per process so versions never repeat across restarts (clients cache by version).
+data_version = time.time_ns()
+data_changed = asyncio.Event()
+
+async def notify_data_changed():
+    global data_version
+    data_version += 1
+    # Wake every /events stream currently waiting, then re-arm the event
+    data_changed.set()
+    data_changed.clear()
+
+# /predict micro-batching: requests are queued for up to PREDICT_BATCH_WAIT
+# seconds or PREDICT_BATCH_SIZE rows, then predicted with a single model call
+PREDICT_BATCH_SIZE = 64
+PREDICT_BATCH_WAIT = 0.005  # seconds
+predict_queue = None  # Created in lifespan, on the server's event loop
+
+async def predict_batcher():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await predict_queue.get()]
+        deadline = loop.time() + PREDICT_BATCH_WAIT
+        while len(batch) < PREDICT_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(predict_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        futures = [future for _, future in batch]
+        try:
+            X = np.array([features for features, _ in batch], dtype=np.float64)
+            predictions = model.predict(X)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        
+        for future, prediction in zip(futures, predictions):
+            if not future.done():
+                future.set_result(int(prediction))
 
 @app.post("/predict", response_model=Dict[str, Any])
-async def predict(data: MachineData):
+async def predict(data: MachineData, background_tasks: BackgroundTasks):
     try:
-        # Create DataFrame with updated column names
-        df = pd.DataFrame([{
-            "Type": data.Type,
-            "Air temperature [K]": data.Air_temperature_K,
-            "Process temperature [K]": data.Process_temperature_K,
-            "Rotational speed [rpm]": data.Rotational_speed_rpm,
-            "Torque [Nm]": data.Torque_Nm,
-            "Tool wear [min]": data.Tool_wear_min
-        }])
+        features = [
+            data.Type,
+            data.Air_temperature_K,
+            data.Process_temperature_K,
+            data.Rotational_speed_rpm,
+            data.Torque_Nm,
+            data.Tool_wear_min
+        ]
         
-        prediction = int(model.predict(df)[0])
+        # Rows go to the model as an ndarray (building a 1-row DataFrame costs
+        # far more than the prediction itself), batched with concurrent requests
+        future = asyncio.get_running_loop().create_future()
+        await predict_queue.put((features, future))
+        prediction = await future
         
-        # Store data and prediction
-        record = df.iloc[0].to_dict()
+        # Store data and prediction with the updated column names
+        record = dict(zip(FEATURE_COLS, features))
         record["prediction"] = prediction
         
         if use_mongodb:
-            collection.insert_one(record)
+            # Write after the response is sent so the client doesn't wait on MongoDB
+            background_tasks.add_task(collection.insert_one, record)
+            background_tasks.add_task(notify_data_changed)
         else:
-            all_data = get_all_data()
-            all_data.append(record)
-            save_data(all_data)
+            append_data([record])
+            await notify_data_changed()
         
         return {"prediction": prediction, "failure": bool(prediction)}
     except Exception as e:
@@ -117,61 +266,176 @@ async def predict(data: MachineData):
 @app.post("/generate_data", response_model=Dict[str, Any])
 async def generate_data(count: int = 100):
     try:
-        generated_data = []
+        # Nothing to generate; the model can't predict on an empty frame
+        if count <= 0:
+            return {"message": f"Generated {count} data points", "count": count}
         
-        for _ in range(count):
-            machine_type = random.choice([0, 1, 2])
-            air_temp = round(random.uniform(295, 304), 1)
-            process_temp = round(random.uniform(305, 313), 1)
-            rotational_speed = round(random.uniform(1000, 2500))
-            torque = round(random.uniform(3.5, 77), 2)
-            tool_wear = round(random.uniform(0, 253))
-            
-            data = {
-                "Type": machine_type,
-                "Air temperature [K]": air_temp,
-                "Process temperature [K]": process_temp,
-                "Rotational speed [rpm]": rotational_speed,
-                "Torque [Nm]": torque,
-                "Tool wear [min]": tool_wear
-            }
-            
-            # Convert to DataFrame for prediction
-            df = pd.DataFrame([data])
-            prediction = int(model.predict(df)[0])
-            
-            # Add prediction to the data
-            data["prediction"] = prediction
-            
-            # Store data
-            if use_mongodb:
-                collection.insert_one(data)
-            else:
-                generated_data.append(data)
-            
-        if not use_mongodb:
-            all_data = get_all_data()
-            all_data.extend(generated_data)
-            save_data(all_data)
+        # Generate all rows at once instead of one Python iteration per row
+        df = pd.DataFrame({
+            "Type": RNG.integers(0, 3, count),
+            "Air temperature [K]": np.round(RNG.uniform(295, 304, count), 1),
+            "Process temperature [K]": np.round(RNG.uniform(305, 313, count), 1),
+            "Rotational speed [rpm]": np.round(RNG.uniform(1000, 2500, count)).astype(int),
+            "Torque [Nm]": np.round(RNG.uniform(3.5, 77, count), 2),
+            "Tool wear [min]": np.round(RNG.uniform(0, 253, count)).astype(int)
+        })
+        
+        # Single batched prediction for the whole frame
+        df["prediction"] = model.predict(df).astype(int)
+        generated_data = df.to_dict(orient="records")
+        
+        # Store data
+        if use_mongodb:
+            bulk_collection.insert_many(generated_data, ordered=False)
+        else:
+            append_data(generated_data)
+        await notify_data_changed()
         
         return {"message": f"Generated {count} data points", "count": count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/data", response_model=Dict[str, Any])
+# Records per NDJSON chunk streamed by /data (matches the MongoDB cursor batch size)
+NDJSON_CHUNK_SIZE = 1000
+
+@app.get("/data")
 async def get_data(limit: int = 10000):
+    # Streams newline-delimited JSON, one record per line, encoding each cursor
+    # batch as it arrives instead of building the whole response in memory
     try:
         if use_mongodb:
-            data = list(collection.find({}, {"_id": 0}).limit(limit))
+            cursor = collection.find({}, DATA_PROJECTION).batch_size(NDJSON_CHUNK_SIZE).limit(limit)
+            # The cursor is lazy: fetch the first batch here, so query and
+            # connection errors still return a 500 before streaming starts
+            first = next(cursor, None)
+            records = itertools.chain([first], cursor) if first is not None else []
         else:
-            data = get_all_data()
             # Apply limit
-            data = data[-limit:] if len(data) > limit else data
+            records = DATA_CACHE[-limit:] if limit > 0 else DATA_CACHE[:]
+        
+        def ndjson_gen():
+            chunk = []
+            for record in records:
+                chunk.append(orjson.dumps(record) + b"\n")
+                if len(chunk) == NDJSON_CHUNK_SIZE:
+                    yield b"".join(chunk)
+                    chunk = []
+            if chunk:
+                yield b"".join(chunk)
+        
+        return StreamingResponse(ndjson_gen(), media_type="application/x-ndjson")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def compute_stats():
+    if use_mongodb:
+        result = next(collection.aggregate(STATS_PIPELINE))
+        if not result["summary"]:
+            return {"count": 0}
+        summary = result["summary"][0]
+        type_prediction_counts = collection.aggregate(TYPE_PREDICTION_PIPELINE)
+        stats = {
+            "count": summary["count"],
+            "max_torque": summary["max_torque"],
+            "max_tool_wear": summary["max_tool_wear"],
+            "avg_rpm": summary["avg_rpm"],
+            "failure_counts": [
+                {"prediction": d["_id"], "Count": d["count"]} for d in result["failure_counts"]
+            ],
+            "type_counts": [
+                {"Type": d["_id"], "Count": d["count"]} for d in result["type_counts"]
+            ],
+            "type_prediction_counts": [
+                {**d["_id"], "Count": d["count"]} for d in type_prediction_counts
+            ]
+        }
+    else:
+        if not DATA_CACHE:
+            return {"count": 0}
+        df = pd.DataFrame(DATA_CACHE)
+        failure_counts = df["prediction"].value_counts().reset_index(name="Count")
+        type_counts = df["Type"].value_counts().reset_index(name="Count")
+        # Hashed count of the (Type, prediction) pairs, without GroupBy dispatch
+        type_prediction_counts = df.value_counts(["Type", "prediction"]).sort_index().reset_index(name="Count")
+        aggs = df.agg({
+            "Torque [Nm]": "max",
+            "Tool wear [min]": "max",
+            "Rotational speed [rpm]": "mean"
+        })
+        stats = {
+            "count": len(df),
+            "max_torque": float(aggs["Torque [Nm]"]),
+            "max_tool_wear": float(aggs["Tool wear [min]"]),
+            "avg_rpm": float(aggs["Rotational speed [rpm]"]),
+            "failure_counts": failure_counts.to_dict(orient="records"),
+            "type_counts": type_counts.to_dict(orient="records"),
+            "type_prediction_counts": type_prediction_counts.to_dict(orient="records")
+        }
+    
+    return stats
+
+# Aggregates are cached briefly and keyed on the data version and size, so repeated
+# dashboard reruns against unchanged data don't re-run the aggregation
+STATS_TTL = 5  # seconds
+stats_cache = {"key": None, "expires": 0.0, "stats": None}
+
+@app.get("/stats", response_model=Dict[str, Any])
+async def get_stats():
+    try:
+        count = collection.estimated_document_count() if use_mongodb else len(DATA_CACHE)
+        key = (data_version, count)
+        now = time.monotonic()
+        if stats_cache["key"] != key or now >= stats_cache["expires"]:
+            stats_cache.update(key=key, expires=now + STATS_TTL, stats=compute_stats())
+        
+        return stats_cache["stats"]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/sample", response_model=Dict[str, Any])
+async def get_sample(n: int = 500):
+    try:
+        n = max(n, 0)
+        if use_mongodb:
+            # $sample runs inside MongoDB so only n documents ever leave the database
+            data = list(collection.aggregate([{"$sample": {"size": n}}, {"$project": SAMPLE_PROJECTION}])) if n else []
+        else:
+            data = [
+                {col: record[col] for col in SAMPLE_COLS}
+                for record in random.sample(DATA_CACHE, min(n, len(DATA_CACHE)))
+            ]
         
         return {"data": data, "count": len(data)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Each /events stream ends after this long and the client reconnects, so open
+# streams never hold up a server shutdown or reload for longer than this
+EVENTS_STREAM_LIFETIME = 5  # seconds
+
+@app.get("/events")
+async def events():
+    # Server-Sent Events stream: sends the current data version on connect and
+    # again after every write, then closes after EVENTS_STREAM_LIFETIME
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + EVENTS_STREAM_LIFETIME
+        last_sent = None
+        while True:
+            if data_version != last_sent:
+                last_sent = data_version
+                yield f"data: {last_sent}\n\n"
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                return
+            try:
+                await asyncio.wait_for(data_changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.delete("/clear_data", response_model=Dict[str, Any])
 async def clear_data():
     try:
@@ -179,9 +443,9 @@ async def clear_data():
             result = collection.delete_many({})
             deleted_count = result.deleted_count
         else:
-            all_data = get_all_data()
-            deleted_count = len(all_data)
-            save_data([])
+            deleted_count = len(DATA_CACHE)
+            clear_file_data()
+        await notify_data_changed()
         
         return {"message": f"Deleted {deleted_count} data points"}
     except Exception as e:
@@ -189,11 +453,3 @@ async def clear_data():
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
-
-if not os.path.exists("model.pkl"):
-    class DummyModel:
-        def predict(self, X):
-            return np.random.choice([0, 1], size=len(X))
-    model = DummyModel()
-    print("⚠️ Warning: model.pkl not found. Using dummy model instead.")
-
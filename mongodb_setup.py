@@ -54,9 +54,13 @@ def setup_indexes():
         
         # Create indexes
         print("Creating indexes for better performance...")
-        collection.create_index("Type")
         collection.create_index("prediction")
         collection.create_index([("Rotational speed [rpm]", 1)])
+        # Compound index walked by the $sort ahead of the (Type, prediction) grouping in /stats.
+        # Its Type prefix also serves Type-only queries, so the old single-field index is dropped.
+        collection.create_index([("Type", 1), ("prediction", 1)])
+        if "Type_1" in collection.index_information():
+            collection.drop_index("Type_1")
         
         print("✅ Indexes created successfully")
         return True